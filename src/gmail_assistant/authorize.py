@@ -0,0 +1,25 @@
+"""Sign in to Google Docs once so the server can read the guidelines doc.
+
+Run this from a terminal (not through the MCP client):
+    python src/gmail_assistant/authorize.py
+
+It opens a browser for consent and writes token.json next to
+credentials.json. Run it again if the token is revoked.
+"""
+import logging
+from google_docs_helper import GoogleDocsHelper, CREDENTIALS_PATH, TOKEN_PATH
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("gmail-assistant")
+
+def main():
+    """Run the OAuth consent flow and save the token."""
+    if not CREDENTIALS_PATH.exists():
+        raise SystemExit(f"Download your OAuth client credentials to {CREDENTIALS_PATH} first")
+    
+    helper = GoogleDocsHelper(credentials_path=str(CREDENTIALS_PATH), token_path=str(TOKEN_PATH))
+    helper.authenticate(interactive=True)
+    logger.info(f"Saved Google Docs token to {TOKEN_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -1,170 +1,337 @@
-import imaplib
-import smtplib
+import binascii
+import codecs
 import datetime
+import functools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import email
-from email.header import decode_header
+import email.header
+from email.parser import HeaderParser
+from email.utils import getaddresses
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from imapclient import IMAPClient
+from imapclient.exceptions import IMAPClientError, IMAPClientAbortError
 import logging
 
 logger = logging.getLogger("gmail-assistant")
 
+# Max emails per FETCH command - keeps requests under server size limits
+FETCH_BATCH_SIZE = 100
+
+# Only pull the headers we use plus the start of the body. BODY.PEEK leaves
+# the \Seen flag alone, and the partial fetch caps bytes moved per message.
+FETCH_ITEMS = [
+    "BODY.PEEK[HEADER.FIELDS (FROM TO CC SUBJECT DATE MESSAGE-ID "
+    "CONTENT-TYPE CONTENT-TRANSFER-ENCODING)]",
+    "BODY.PEEK[TEXT]<0.4096>"
+]
+
+# Email bodies are truncated to this many bytes before decoding
+MAX_BODY_BYTES = 2000
+
+# Worker threads used to parse fetched emails
+PARSE_WORKERS = 4
+
+# Connections idle longer than this get a NOOP check before reuse
+KEEPALIVE_SECONDS = 60
+
+# UIDPLUS response to APPEND: [APPENDUID <uidvalidity> <uid>]
+APPENDUID_RE = re.compile(rb"\[APPENDUID \d+ (\d+)\]")
+
+@functools.lru_cache(maxsize=4096)
+def decode_header(header: str) -> str:
+    """Decode an RFC 2047 email header, caching results for repeated fetches."""
+    if not header:
+        return ""
+    # Replace undecodable bytes so a malformed subject doesn't drop the email
+    return "".join(
+        _decode_header_part(text, encoding) if isinstance(text, bytes) else text
+        for text, encoding in email.header.decode_header(header)
+    )
+
+def _decode_header_part(text: bytes, encoding: str | None) -> str:
+    """Decode one encoded-word, falling back to utf-8 for unknown charsets."""
+    if encoding is None:
+        # Unencoded text between encoded-words comes back in this codec
+        return text.decode("raw-unicode-escape")
+    try:
+        return text.decode(encoding, errors="replace")
+    except LookupError:
+        return text.decode("utf-8", errors="replace")
+
 class GmailClient:
     def __init__(self, email_address: str, app_password: str):
         self.email_address = email_address
         self.app_password = app_password
+        self._email_lc = email_address.lower()
         self.imap = None
+        # (folder, readonly) currently selected on the IMAP connection
+        self._selected = None
+        self._imap_used_at = 0.0
+        # Connections are shared process-wide, so serialize access to them
+        self._lock = threading.RLock()
+        self._parse_pool = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="email-parse")
     
     def connect(self):
         """Connect to Gmail via IMAP."""
         try:
-            self.imap = imaplib.IMAP4_SSL("imap.gmail.com")
+            self.imap = IMAPClient("imap.gmail.com", ssl=True)
             self.imap.login(self.email_address, self.app_password)
+            self._selected = None
+            self._imap_used_at = time.monotonic()
             logger.info("Successfully connected to Gmail")
         except Exception as e:
             logger.error(f"Failed to connect to Gmail: {e}")
             raise
     
+    def ensure_connected(self):
+        """Reuse the IMAP connection, reconnecting if it has gone stale."""
+        with self._lock:
+            if self.imap and time.monotonic() - self._imap_used_at > KEEPALIVE_SECONDS:
+                try:
+                    self.imap.noop()
+                except (IMAPClientError, OSError) as e:
+                    logger.warning(f"IMAP connection lost, reconnecting: {e}")
+                    self.imap = None
+            if not self.imap:
+                self.connect()
+            self._imap_used_at = time.monotonic()
+    
+    def _ensure_selected(self, folder: str, readonly: bool = False):
+        """Select a folder unless it is already selected on this connection.
+        
+        readonly uses EXAMINE, which doesn't take write access to the mailbox.
+        """
+        if self._selected != (folder, readonly):
+            self.imap.select_folder(folder, readonly=readonly)
+            self._selected = (folder, readonly)
+    
     def get_unread_emails(self, max_results: int = 10):
         """Fetch unread emails."""
-        if not self.imap:
-            self.connect()
-        
-        # Select inbox
-        self.imap.select("INBOX")
-        
-        # Search for unread emails
-        status, messages = self.imap.search(None, "UNSEEN")
+        with self._lock:
+            self.ensure_connected()
+            try:
+                return self._fetch_unread_emails(max_results)
+            except (IMAPClientAbortError, OSError):
+                # Drop the broken connection so the next call reconnects
+                self.imap = None
+                raise
+    
+    def _fetch_unread_emails(self, max_results: int):
+        """Search INBOX for unread emails and fetch them on the open connection."""
+        # Select inbox - read-only is enough for search and PEEK fetches
+        self._ensure_selected("INBOX", readonly=True)
         
-        if status != "OK":
-            return {"to_me": [], "cc_me": []}
+        # Search for unread emails - UIDs stay stable across EXPUNGEs
+        uids = sorted(self.imap.search(["UNSEEN"]))
+        uids = uids[-max_results:]  # Get latest N emails
         
-        email_ids = messages[0].split()
-        email_ids = email_ids[-max_results:]  # Get latest N emails
+        # Parse on worker threads so parsing one batch overlaps fetching the next
+        parsed = []
+        for start in range(0, len(uids), FETCH_BATCH_SIZE):
+            batch = uids[start:start + FETCH_BATCH_SIZE]
+            response = self.imap.fetch(batch, FETCH_ITEMS)
+            
+            for uid in batch:
+                if uid not in response:
+                    continue
+                header_bytes, text_bytes = self._split_sections(response[uid])
+                parsed.append((uid, self._parse_pool.submit(self._parse_email, str(uid), header_bytes, text_bytes)))
         
-        to_me = []
-        cc_me = []
+        grouped = {"to_me": [], "cc_me": []}
         
-        for email_id in email_ids:
+        # Collect in UID order so results stay oldest-to-newest
+        for uid, future in parsed:
             try:
-                # Fetch email data
-                status, msg_data = self.imap.fetch(email_id, "(RFC822)")
-                
-                if status != "OK":
-                    continue
-                
-                # Parse email
-                msg = email.message_from_bytes(msg_data[0][1])
-                
-                # Decode subject
-                subject = self._decode_header(msg["Subject"])
-                from_addr = msg["From"]
-                date = msg["Date"]
-
-                # Get To and CC fields - they might be tuples or strings
-                to_field = msg.get("To", "")
-                cc_field = msg.get("Cc", "")
-
-                # Convert to string if tuple
-                if isinstance(to_field, tuple):
-                    to_field = ", ".join(str(x) for x in to_field)
-                if isinstance(cc_field, tuple):
-                    cc_field = ", ".join(str(x) for x in cc_field)
-
-                # Ensure they're strings
-                to_field = str(to_field) if to_field else ""
-                cc_field = str(cc_field) if cc_field else ""
-                
-                # Get email body
-                body = self._get_email_body(msg)
-
-                email_data = {
-                "id": email_id.decode(),
-                "from": from_addr,
-                "subject": subject,
-                "date": date,
-                "to": to_field,
-                "cc": cc_field,
-                "body": body[:2000] if body else ""
-            }
-                
-            # Check if user email is in To or CC field
-                if self.email_address.lower() in to_field.lower():
-                    to_me.append(email_data)
-                elif self.email_address.lower() in cc_field.lower():
-                    cc_me.append(email_data)
-                else:
-                    # If we can't determine, put in to_me as default
-                    to_me.append(email_data)
+                result = future.result()
             except Exception as e:
-                logger.error(f"Error processing email {email_id}: {e}")
+                logger.error(f"Error processing email {uid}: {e}")
                 continue
-        return {"to_me": to_me, "cc_me": cc_me}
+            
+            bucket, email_data = result
+            grouped[bucket].append(email_data)
+        return grouped
     
-    def _decode_header(self, header):
-        """Decode email header."""
-        if header is None:
-            return ""
-        decoded = decode_header(header)
-        return "".join([
-            text.decode(encoding or "utf-8") if isinstance(text, bytes) else text
-            for text, encoding in decoded
-        ])
+    def _classify(self, to_field: str, cc_field: str) -> str:
+        """Return the bucket an email belongs in."""
+        # Check if user email is in To or CC field
+        if self._has_address(to_field):
+            return "to_me"
+        if self._has_address(cc_field):
+            return "cc_me"
+        # If we can't determine, put in to_me as default
+        return "to_me"
     
-    def _get_email_body(self, msg):
-        """Extract email body."""
+    def _parse_email(self, email_id: str, header_bytes: bytes, text_bytes: bytes):
+        """Parse fetched header and body bytes into a (bucket, email dict) pair."""
+        # Parse headers only - the body is decoded separately below. Parsing
+        # text rather than bytes keeps raw non-ASCII headers as plain str
+        # (compat32 turns undecoded 8-bit bytes into lossy Header objects)
+        msg = HeaderParser().parsestr(self._decode_header_bytes(header_bytes))
+
+        # Get To and CC fields
+        to_field = msg.get("To") or ""
+        cc_field = msg.get("Cc") or ""
+        
+        bucket = self._classify(to_field, cc_field)
+        
+        # Decode subject
+        subject = decode_header(msg["Subject"] or "")
+        from_addr = msg["From"] or ""
+        date = msg["Date"] or ""
+        
+        # Get email body
+        if msg.get_content_maintype() == "multipart":
+            # Need the MIME structure to find the text/plain part. The header
+            # block ends with a blank line, so the (truncated) body can be
+            # appended directly
+            body = self._get_email_body(email.message_from_bytes(header_bytes + text_bytes))
+        else:
+            body = self._decode_body(text_bytes, msg.get("Content-Transfer-Encoding", ""))
+
+        return bucket, {
+            "id": email_id,
+            "from": from_addr,
+            "subject": subject,
+            "date": date,
+            "to": to_field,
+            "cc": cc_field,
+            "message_id": msg.get("Message-ID") or "",
+            "body": body
+        }
+    
+    def _decode_header_bytes(self, header_bytes: bytes) -> str:
+        """Decode a raw header block - 8-bit headers are UTF-8 in practice,
+        with latin-1 as a lossless fallback for legacy mailers."""
+        try:
+            return header_bytes.decode("utf-8")
+        except UnicodeDecodeError:
+            return header_bytes.decode("latin-1")
+    
+    def _has_address(self, field: str) -> bool:
+        """Check whether the user's address is one of the addresses in a header."""
+        return any(addr.lower() == self._email_lc for _, addr in getaddresses([field]))
+    
+    def _split_sections(self, data: dict):
+        """Return (header_bytes, text_bytes) from one message's FETCH data.
+        
+        The server echoes the section names back (without .PEEK), so match
+        on prefix rather than the exact requested item string.
+        """
+        header_bytes = text_bytes = b""
+        for key, value in data.items():
+            if key.startswith(b"BODY[HEADER"):
+                header_bytes = value or b""
+            elif key.startswith(b"BODY[TEXT]"):
+                text_bytes = value or b""
+        return header_bytes, text_bytes
+    
+    def _get_email_body(self, msg, max_len: int = MAX_BODY_BYTES):
+        """Extract email body, decoding at most max_len bytes."""
         if msg.is_multipart():
             for part in msg.walk():
                 if part.get_content_type() == "text/plain":
-                    return part.get_payload(decode=True).decode()
+                    payload = part.get_payload(decode=True)
+                    break
+            else:
+                return ""
         else:
-            return msg.get_payload(decode=True).decode()
-        return ""
+            payload = msg.get_payload(decode=True)
+        if not payload:
+            return ""
+        return payload[:max_len].decode(errors="replace")
+    
+    def _decode_body(self, payload: bytes, transfer_encoding: str, max_len: int = MAX_BODY_BYTES):
+        """Decode a single-part body without building a MIME tree."""
+        transfer_encoding = str(transfer_encoding).strip().lower()
+        try:
+            if transfer_encoding == "base64":
+                # The partial fetch can cut a base64 quantum in half - drop the remainder
+                payload = b"".join(payload.split())
+                payload = codecs.decode(payload[:len(payload) // 4 * 4], "base64")
+            elif transfer_encoding == "quoted-printable":
+                payload = codecs.decode(payload, "quopri")
+        except (binascii.Error, ValueError) as e:
+            logger.warning(f"Could not decode {transfer_encoding} body: {e}")
+            return ""
+        return payload[:max_len].decode(errors="replace")
     
     def create_draft_reply(self, to_email: str, subject: str, body: str, in_reply_to: str = None):
-        """Create a draft reply in Gmail using SMTP."""
+        """Create a draft reply in Gmail's Drafts folder via IMAP."""
+        with self._lock:
+            try:
+                self._save_draft(to_email, subject, body, in_reply_to)
+                logger.info(f"Draft reply created for {to_email}")
+                return True
+                
+            except Exception as e:
+                logger.error(f"Error creating draft reply: {e}")
+                raise
+    
+    def create_draft_replies(self, drafts: list[dict]) -> list:
+        """Create several draft replies in one locked IMAP session.
+        
+        Each draft is a dict of create_draft_reply keyword arguments. Returns
+        the draft UID (see _save_draft) or the raised exception for each
+        draft, in order.
+        """
+        results = []
+        with self._lock:
+            for draft in drafts:
+                try:
+                    results.append(self._save_draft(**draft))
+                except Exception as e:
+                    logger.error(f"Error creating draft reply for {draft.get('to_email')}: {e}")
+                    results.append(e)
+        created = sum(not isinstance(result, Exception) for result in results)
+        logger.info(f"Created {created} of {len(drafts)} draft replies")
+        return results
+    
+    def _save_draft(self, to_email: str, subject: str, body: str, in_reply_to: str = None) -> str:
+        """Build a reply message and append it to the Drafts folder.
+        
+        Returns the draft's UID in the Drafts folder, or "" if the server
+        didn't report one.
+        """
+        # Create message
+        msg = MIMEMultipart()
+        msg['From'] = self.email_address
+        msg['To'] = to_email
+        msg['Subject'] = f"Re: {subject}" if not subject.startswith("Re:") else subject
+        
+        # Add In-Reply-To header if provided
+        if in_reply_to:
+            msg['In-Reply-To'] = in_reply_to
+            msg['References'] = in_reply_to
+        
+        # Add body
+        msg.attach(MIMEText(body, 'plain'))
+        
+        # Connect to IMAP to save as draft
+        self.ensure_connected()
+        
         try:
-            # Connect to Gmail SMTP
-            smtp = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-            smtp.login(self.email_address, self.app_password)
-            
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.email_address
-            msg['To'] = to_email
-            msg['Subject'] = f"Re: {subject}" if not subject.startswith("Re:") else subject
-            
-            # Add In-Reply-To header if provided
-            if in_reply_to:
-                msg['In-Reply-To'] = in_reply_to
-                msg['References'] = in_reply_to
-            
-            # Add body
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Connect to IMAP to save as draft
-            if not self.imap:
-                self.connect()
-            
             # Save to Drafts folder
-            self.imap.select('[Gmail]/Drafts')
-            self.imap.append(
+            self._ensure_selected('[Gmail]/Drafts')
+            response = self.imap.append(
                 '[Gmail]/Drafts',
-                '',
-                imaplib.Time2Internaldate(datetime.datetime.now(datetime.timezone.utc)),
-                msg.as_bytes()
+                msg.as_bytes(),
+                msg_time=datetime.datetime.now(datetime.timezone.utc)
             )
-            
-            smtp.quit()
-            logger.info(f"Draft reply created for {to_email}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error creating draft reply: {e}")
+        except (IMAPClientAbortError, OSError):
+            # Drop a connection that failed mid-command so the next call reconnects
+            self.imap = None
             raise
+        
+        match = APPENDUID_RE.search(response or b"")
+        return match.group(1).decode() if match else ""
             
     def close(self):
         """Close IMAP connection."""
-        if self.imap:
-            self.imap.close()
-            self.imap.logout()
\ No newline at end of file
+        with self._lock:
+            if self.imap:
+                self.imap.logout()
+                self.imap = None
\ No newline at end of file
@@ -1,5 +1,8 @@
 import os
-import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -10,37 +13,67 @@ logger = logging.getLogger("gmail-assistant")
 
 SCOPES = ['https://www.googleapis.com/auth/documents.readonly']
 
+# OAuth client secrets and the token written by authorize.py
+CREDENTIALS_PATH = Path.home() / "mcp-servers/gmail-assistant-mcp/credentials.json"
+TOKEN_PATH = Path.home() / "mcp-servers/gmail-assistant-mcp/token.json"
+
+# Fetched documents are reused for this long before hitting the API again
+CACHE_TTL_SECONDS = 600
+CACHE_MAX_DOCUMENTS = 16
+
 class GoogleDocsHelper:
     def __init__(self, credentials_path, token_path):
         self.credentials_path = credentials_path
         self.token_path = token_path
         self.creds = None
         self.service = None
+        # document_id -> (text, fetched_at), least recently used first
+        self._cache = OrderedDict()
+        # Read on the event loop, written from worker threads
+        self._cache_lock = threading.Lock()
         
-    def authenticate(self):
-        """Authenticate with Google Docs API."""
+    def authenticate(self, interactive: bool = False):
+        """Authenticate with Google Docs API.
+        
+        Only authorize.py passes interactive=True - the browser consent flow
+        prints to stdout and blocks, so the MCP server must never run it.
+        """
         if os.path.exists(self.token_path):
-            with open(self.token_path, 'rb') as token:
-                self.creds = pickle.load(token)
+            self.creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
         
         # If credentials are invalid or don't exist, authenticate
         if not self.creds or not self.creds.valid:
             if self.creds and self.creds.expired and self.creds.refresh_token:
                 self.creds.refresh(Request())
-            else:
+            elif interactive:
                 flow = InstalledAppFlow.from_client_secrets_file(
                     self.credentials_path, SCOPES)
                 self.creds = flow.run_local_server(port=0)
+            else:
+                raise RuntimeError("No valid Google Docs token - run authorize.py to sign in")
             
             # Save credentials for next run
-            with open(self.token_path, 'wb') as token:
-                pickle.dump(self.creds, token)
+            with open(self.token_path, 'w') as token:
+                token.write(self.creds.to_json())
         
         self.service = build('docs', 'v1', credentials=self.creds)
         logger.info("Successfully authenticated with Google Docs API")
     
+    def get_cached_text(self, document_id):
+        """Return a document's cached text if still fresh, otherwise None."""
+        with self._cache_lock:
+            cached = self._cache.get(document_id)
+            if cached and time.monotonic() - cached[1] < CACHE_TTL_SECONDS:
+                self._cache.move_to_end(document_id)
+                return cached[0]
+            return None
+    
     def get_document_text(self, document_id):
-        """Fetch text content from a Google Doc."""
+        """Fetch text content from a Google Doc, cached for CACHE_TTL_SECONDS."""
+        cached = self.get_cached_text(document_id)
+        if cached is not None:
+            return cached
+        
         if not self.service:
             self.authenticate()
         
@@ -50,26 +83,34 @@ class GoogleDocsHelper:
             
             # Extract text from the document
             doc_content = document.get('body').get('content')
-            text = self._read_structural_elements(doc_content)
+            parts = []
+            self._read_structural_elements(doc_content, parts)
+            text = ''.join(parts)
             
             logger.info(f"Successfully fetched document (length: {len(text)} chars)")
+            
+            with self._cache_lock:
+                self._cache[document_id] = (text, time.monotonic())
+                self._cache.move_to_end(document_id)
+                if len(self._cache) > CACHE_MAX_DOCUMENTS:
+                    self._cache.popitem(last=False)
             return text
             
         except Exception as e:
             logger.error(f"Error fetching Google Doc: {e}")
             raise
     
-    def _read_structural_elements(self, elements):
-        """Recursively read structural elements to extract text."""
-        text = ''
+    def _read_structural_elements(self, elements, parts):
+        """Recursively read structural elements, appending their text to parts."""
         for element in elements:
             if 'paragraph' in element:
-                for elem in element.get('paragraph').get('elements'):
-                    if 'textRun' in elem:
-                        text += elem.get('textRun').get('content')
+                paragraph_elements = element['paragraph']['elements']
+                for elem in paragraph_elements:
+                    text_run = elem.get('textRun')
+                    if text_run:
+                        parts.append(text_run.get('content', ''))
             elif 'table' in element:
                 # Handle tables if needed
-                for row in element.get('table').get('tableRows'):
-                    for cell in row.get('tableCells'):
-                        text += self._read_structural_elements(cell.get('content'))
-        return text
\ No newline at end of file
+                for row in element['table']['tableRows']:
+                    for cell in row['tableCells']:
+                        self._read_structural_elements(cell['content'], parts)
\ No newline at end of file
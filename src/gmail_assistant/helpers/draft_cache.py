@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+logger = logging.getLogger("gmail-assistant")
+
+DRAFT_CACHE_PATH = Path.home() / ".gmail-assistant-cache.sqlite"
+
+# Entries older than this are pruned when the cache is opened
+DRAFT_CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+_connection = None
+
+def _connect() -> sqlite3.Connection:
+    """Open the on-disk cache, creating the tables on first use."""
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(DRAFT_CACHE_PATH)
+        with _connection:
+            _connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (hash TEXT PRIMARY KEY, draft_id TEXT, ts INTEGER)"
+            )
+            # Emails waiting on a submitted Message Batch - custom_id is the email id
+            _connection.execute(
+                "CREATE TABLE IF NOT EXISTS batches (batch_id TEXT, custom_id TEXT, to_email TEXT, "
+                "subject TEXT, hash TEXT, PRIMARY KEY (batch_id, custom_id))"
+            )
+            _connection.execute("CREATE INDEX IF NOT EXISTS batches_hash ON batches (hash)")
+            _connection.execute(
+                "DELETE FROM cache WHERE ts < ?",
+                (int(time.time()) - DRAFT_CACHE_MAX_AGE_SECONDS,)
+            )
+        logger.info(f"Draft cache opened at {DRAFT_CACHE_PATH}")
+    return _connection
+
+def email_hash(email_item: dict) -> str:
+    """Hash an email's id and body - a changed body gets a fresh draft."""
+    return hashlib.sha256(f"{email_item['id']}:{email_item['body']}".encode()).hexdigest()
+
+def get_draft_id(email_hash: str) -> str | None:
+    """Return the draft id recorded for an email hash, or None if not drafted."""
+    row = _connect().execute("SELECT draft_id FROM cache WHERE hash = ?", (email_hash,)).fetchone()
+    return row[0] if row else None
+
+def record_draft(email_hash: str, draft_id: str):
+    """Remember that a draft was created for an email hash."""
+    connection = _connect()
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (hash, draft_id, ts) VALUES (?, ?, ?)",
+            (email_hash, draft_id, int(time.time()))
+        )
+
+def record_batch(batch_id: str, emails: list[dict]):
+    """Remember the emails a Message Batch is drafting replies for.
+    
+    Each email is a dict with id (the request custom_id), to_email, subject
+    and hash.
+    """
+    connection = _connect()
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO batches (batch_id, custom_id, to_email, subject, hash) VALUES (?, ?, ?, ?, ?)",
+            [
+                (batch_id, email_item['id'], email_item['to_email'], email_item['subject'], email_item['hash'])
+                for email_item in emails
+            ]
+        )
+
+def get_batch(batch_id: str) -> list[dict]:
+    """Return the emails recorded for a Message Batch, or [] if unknown."""
+    rows = _connect().execute(
+        "SELECT custom_id, to_email, subject, hash FROM batches WHERE batch_id = ? ORDER BY rowid",
+        (batch_id,)
+    ).fetchall()
+    return [
+        {"id": custom_id, "to_email": to_email, "subject": subject, "hash": email_hash}
+        for custom_id, to_email, subject, email_hash in rows
+    ]
+
+def get_pending_batch_id(email_hash: str) -> str | None:
+    """Return the uncollected Message Batch drafting an email hash, or None."""
+    row = _connect().execute("SELECT batch_id FROM batches WHERE hash = ?", (email_hash,)).fetchone()
+    return row[0] if row else None
+
+def forget_batch(batch_id: str, custom_ids: list[str]):
+    """Drop emails from a Message Batch once they no longer need collecting."""
+    connection = _connect()
+    with connection:
+        connection.executemany(
+            "DELETE FROM batches WHERE batch_id = ? AND custom_id = ?",
+            [(batch_id, custom_id) for custom_id in custom_ids]
+        )
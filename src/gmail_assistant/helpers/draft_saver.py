@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from gmail_client import GmailClient
+from helpers import draft_cache
+
+logger = logging.getLogger("gmail-assistant")
+
+async def save_replies(
+    gmail_client: GmailClient,
+    emails: list[dict],
+    replies: dict[str, str | Exception]
+) -> list[dict]:
+    """Save generated replies as drafts in one IMAP session.
+
+    emails are dicts with id, to_email, subject and hash; replies maps each
+    id to its reply text or the exception raised generating it. Saved drafts
+    are recorded in the draft cache. Returns one result dict per email, in
+    order - save_failed marks drafts worth retrying.
+    """
+    generated = [
+        (email_item, replies[email_item['id']]) for email_item in emails
+        if isinstance(replies.get(email_item['id']), str)
+    ]
+    saved = await asyncio.to_thread(gmail_client.create_draft_replies, [
+        {
+            "to_email": email_item['to_email'],
+            "subject": email_item['subject'],
+            "body": reply
+        }
+        for email_item, reply in generated
+    ])
+    outcomes = dict(zip((email_item['id'] for email_item, _ in generated), saved))
+
+    results = []
+    for email_item in emails:
+        reply = replies.get(email_item['id'], RuntimeError("No reply was generated"))
+        outcome = reply if isinstance(reply, Exception) else outcomes[email_item['id']]
+        if isinstance(outcome, Exception):
+            logger.error(f"Error creating draft for {email_item['to_email']}: {outcome}")
+            results.append({
+                "from": email_item['to_email'],
+                "subject": email_item['subject'],
+                "status": f"❌ Failed: {str(outcome)}",
+                "save_failed": not isinstance(reply, Exception)
+            })
+        else:
+            draft_cache.record_draft(email_item['hash'], outcome)
+            results.append({
+                "from": email_item['to_email'],
+                "subject": email_item['subject'],
+                "status": "✅ Draft created",
+                "preview": reply[:100] + "..."
+            })
+    return results
+
+def format_results(results: list[dict]) -> str:
+    """Format result dicts as the per-email lines of a tool summary."""
+    parts = []
+    for result in results:
+        parts.append(f"\n{result['status']} - From: {result['from']}\n   Subject: {result['subject']}\n")
+        if 'preview' in result:
+            parts.append(f"   Preview: {result['preview']}\n")
+    return "".join(parts)
@@ -1,46 +1,77 @@
+import asyncio
 import logging
 from google_docs_helper import GoogleDocsHelper
 
 logger = logging.getLogger("gmail-assistant")
 
+# Serializes guideline refreshes so concurrent tool calls share one Docs fetch
+_guidelines_lock = asyncio.Lock()
+
 async def fetch_guidelines(google_docs_helper: GoogleDocsHelper, guidelines_doc_id: str) -> str:
     """Fetch email guidelines from Google Doc if available."""
     if not google_docs_helper or not guidelines_doc_id:
         return ""
     
-    logger.info("Fetching email guidelines from Google Doc...")
-    
-    try:
-        guidelines = google_docs_helper.get_document_text(guidelines_doc_id)
-        logger.info(f"Guidelines fetched successfully ({len(guidelines)} chars)")
+    # Fast path - fresh guidelines are served without a thread hop or lock
+    guidelines = google_docs_helper.get_cached_text(guidelines_doc_id)
+    if guidelines is not None:
         return guidelines
-    except Exception as e:
-        logger.warning(f"Could not fetch guidelines: {e}")
-        return ""
+    
+    async with _guidelines_lock:
+        # Another call may have refreshed the cache while we waited
+        guidelines = google_docs_helper.get_cached_text(guidelines_doc_id)
+        if guidelines is not None:
+            return guidelines
+        
+        logger.info("Fetching email guidelines from Google Doc...")
+        
+        try:
+            # Docs API client is blocking - keep it off the event loop
+            guidelines = await asyncio.to_thread(google_docs_helper.get_document_text, guidelines_doc_id)
+            logger.info(f"Guidelines fetched successfully ({len(guidelines)} chars)")
+            return guidelines
+        except Exception as e:
+            logger.warning(f"Could not fetch guidelines: {e}")
+            return ""
+
+REPLY_INSTRUCTIONS = """You draft replies to emails.
+
+Please write a thoughtful, professional reply. Keep it concise and focused - aim for 2-3 short paragraphs maximum. Be warm but efficient. Only provide the email body text, no subject line or signatures.
+
+IMPORTANT: Keep your response under 200 words. Get straight to the point."""
 
-def build_reply_prompt(sender: str, subject: str, email_content: str, guidelines: str) -> str:
-    """Build prompt for generating email with guidelines."""
-    prompt = f"""Generate a professional and helpful email reply to the following email:
+GUIDELINES_HEADER = """IMPORTANT: Follow these email writing guidelines:
+
+"""
+
+REPLY_PROMPT_TEMPLATE = """Generate a professional and helpful email reply to the following email:
 
 From: {sender}
 Subject: {subject}
 
 Email content:
-{email_content}
-
-"""
-        
-    if guidelines:
-        prompt += f"""
-IMPORTANT: Follow these email writing guidelines:
+{email_content}"""
 
-{guidelines}
+# Prefix and block shared by every call, built once at import
+_SYSTEM_PREFIX_WITH_GUIDELINES = f"{REPLY_INSTRUCTIONS}\n\n{GUIDELINES_HEADER}"
+_CACHE_CONTROL = {"type": "ephemeral"}
+_SYSTEM_WITHOUT_GUIDELINES = [{"type": "text", "text": REPLY_INSTRUCTIONS, "cache_control": _CACHE_CONTROL}]
 
-"""
+def build_system_prompt(guidelines: str) -> list[dict]:
+    """Build the system prompt from the fixed instructions and guidelines.
     
-    prompt += """
-Please write a thoughtful, professional reply. Keep it concise and focused - aim for 2-3 short paragraphs maximum. Be warm but efficient. Only provide the email body text, no subject line or signatures.
+    Everything that is the same across emails lives here, in one block marked
+    for prompt caching, so repeated drafts only pay for the per-email prompt.
+    """
+    if not guidelines:
+        return _SYSTEM_WITHOUT_GUIDELINES
+    
+    return [{
+        "type": "text",
+        "text": _SYSTEM_PREFIX_WITH_GUIDELINES + guidelines,
+        "cache_control": _CACHE_CONTROL
+    }]
 
-IMPORTANT: Keep your response under 200 words. Get straight to the point."""
-     
-    return prompt
\ No newline at end of file
+def build_reply_prompt(sender: str, subject: str, email_content: str) -> str:
+    """Build the per-email prompt for generating a reply."""
+    return REPLY_PROMPT_TEMPLATE.format(sender=sender, subject=subject, email_content=email_content)
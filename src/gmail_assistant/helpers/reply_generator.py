@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import random
+from anthropic import AsyncAnthropic, APIStatusError
+
+logger = logging.getLogger("gmail-assistant")
+
+MODEL = "claude-sonnet-4-20250514"
+
+# The prompt asks for under 200 words - cap output tokens to match
+MAX_TOKENS = 400
+
+# Error events that can arrive mid-stream after a 200 and are worth retrying.
+# The SDK only retries failed responses, so these are retried here with the
+# same backoff (seconds)
+RETRYABLE_STREAM_ERRORS = {"overloaded_error", "api_error", "rate_limit_error"}
+STREAM_RETRY_INITIAL_DELAY = 0.5
+STREAM_RETRY_MAX_DELAY = 8.0
+
+def _request_params(prompt: str, system: list[dict]) -> dict:
+    """Build messages.create parameters for one reply."""
+    params = {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if system:
+        params["system"] = system
+    return params
+
+def _reply_text(message) -> str:
+    """Return the text of a Messages API response."""
+    return "".join(block.text for block in message.content if block.type == "text")
+
+async def generate_reply(anthropic_client: AsyncAnthropic, prompt: str, system: list[dict]) -> str:
+    """Generate an email reply with Claude.
+    
+    The reply is streamed and its text deltas joined once it completes - the
+    draft needs the full text, so nothing is saved before then. Transient
+    error events sent mid-stream are retried up to the client's max_retries.
+    """
+    params = _request_params(prompt, system)
+    for attempt in range(anthropic_client.max_retries + 1):
+        try:
+            return await _stream_reply(anthropic_client, params)
+        except APIStatusError as e:
+            if attempt == anthropic_client.max_retries or not _is_retryable_stream_error(e):
+                raise
+            delay = min(STREAM_RETRY_INITIAL_DELAY * 2 ** attempt, STREAM_RETRY_MAX_DELAY) * random.uniform(0.75, 1.0)
+            logger.warning(f"Reply stream failed mid-response, retrying in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
+
+async def _stream_reply(anthropic_client: AsyncAnthropic, params: dict) -> str:
+    """Stream one reply and return its text."""
+    text_parts = []
+    async with anthropic_client.messages.stream(**params) as stream:
+        async for text in stream.text_stream:
+            text_parts.append(text)
+    return "".join(text_parts)
+
+def _is_retryable_stream_error(error: APIStatusError) -> bool:
+    """Whether an error is a transient error event sent after a 200 response.
+    
+    Errors on the initial response have already been retried by the SDK.
+    """
+    if error.status_code != 200 or not isinstance(error.body, dict):
+        return False
+    return (error.body.get("error") or {}).get("type") in RETRYABLE_STREAM_ERRORS
+
+async def submit_replies_batch(
+    anthropic_client: AsyncAnthropic,
+    prompts: dict[str, str],
+    system: list[dict]
+) -> str:
+    """Submit replies for {custom_id: prompt} as one Message Batch.
+    
+    Batches cost half as much as individual requests but can take minutes to
+    finish, longer than a tool call should block - collect the results later
+    with collect_replies_batch. Returns the batch id.
+    """
+    batch = await anthropic_client.messages.batches.create(requests=[
+        {"custom_id": custom_id, "params": _request_params(prompt, system)}
+        for custom_id, prompt in prompts.items()
+    ])
+    logger.info(f"Submitted message batch {batch.id} with {len(prompts)} requests")
+    return batch.id
+
+async def collect_replies_batch(
+    anthropic_client: AsyncAnthropic,
+    batch_id: str
+) -> dict[str, str | Exception] | None:
+    """Return a finished batch's {custom_id: reply text, or the exception for
+    that request}, or None while the batch is still processing."""
+    batch = await anthropic_client.messages.batches.retrieve(batch_id)
+    if batch.processing_status != "ended":
+        return None
+    
+    entries = [entry async for entry in await anthropic_client.messages.batches.results(batch_id)]
+    return _batch_replies(entries)
+
+def _batch_replies(entries) -> dict[str, str | Exception]:
+    """Map Message Batch result entries to {custom_id: reply text or exception}."""
+    replies = {}
+    for entry in entries:
+        if entry.result.type == "succeeded":
+            replies[entry.custom_id] = _reply_text(entry.result.message)
+        else:
+            replies[entry.custom_id] = RuntimeError(f"Batch request {entry.result.type}")
+    return replies
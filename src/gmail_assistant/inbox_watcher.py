@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from imapclient import IMAPClient
+from gmail_client import decode_header
+import logging
+
+logger = logging.getLogger("gmail-assistant")
+
+# RFC 2177: clients should re-issue IDLE at least every 29 minutes
+IDLE_RENEW_SECONDS = 29 * 60
+RECONNECT_DELAY_SECONDS = 30
+
+class InboxWatcher:
+    """Watch INBOX over a dedicated IMAP connection using IDLE.
+
+    Runs in a background thread and queues a {"id", "from", "subject"} dict
+    for each message that arrives, until pop_new_mail() collects them.
+    """
+    def __init__(self, email_address: str, app_password: str):
+        self.email_address = email_address
+        self.app_password = app_password
+        self._new_mail = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_uid = None
+
+    def start(self):
+        """Start watching in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="inbox-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the watcher to stop after the current IDLE check."""
+        self._stop.set()
+
+    def pop_new_mail(self) -> list[dict]:
+        """Return and clear the emails that arrived since the last call."""
+        new_mail = []
+        while not self._new_mail.empty():
+            new_mail.append(self._new_mail.get_nowait())
+        return new_mail
+
+    def _run(self):
+        """Keep an IDLE session open, reconnecting on errors."""
+        while not self._stop.is_set():
+            try:
+                self._watch()
+            except Exception as e:
+                logger.error(f"Inbox watcher error, reconnecting in {RECONNECT_DELAY_SECONDS}s: {e}")
+                self._stop.wait(RECONNECT_DELAY_SECONDS)
+
+    def _watch(self):
+        """Connect, then loop on IDLE until stopped or the connection drops."""
+        with IMAPClient("imap.gmail.com", ssl=True) as client:
+            client.login(self.email_address, self.app_password)
+            status = client.select_folder("INBOX", readonly=True)
+            if self._last_uid is None:
+                self._last_uid = status[b"UIDNEXT"] - 1
+            logger.info("Inbox watcher listening for new mail")
+
+            while not self._stop.is_set():
+                client.idle()
+                idle_started = time.monotonic()
+                got_exists = False
+                try:
+                    while not self._stop.is_set() and time.monotonic() - idle_started < IDLE_RENEW_SECONDS:
+                        responses = client.idle_check(timeout=60)
+                        if any(resp[1] == b"EXISTS" for resp in responses if len(resp) > 1):
+                            got_exists = True
+                            break
+                finally:
+                    client.idle_done()
+
+                if got_exists:
+                    self._fetch_new(client)
+
+    def _fetch_new(self, client):
+        """Fetch only messages that arrived since the last seen UID."""
+        uids = [uid for uid in client.search(["UID", f"{self._last_uid + 1}:*"]) if uid > self._last_uid]
+        if not uids:
+            return
+        self._last_uid = max(uids)
+
+        for uid, data in client.fetch(uids, ["ENVELOPE"]).items():
+            envelope = data[b"ENVELOPE"]
+            sender = envelope.from_[0] if envelope.from_ else None
+            subject = envelope.subject.decode(errors="replace") if envelope.subject else ""
+            self._new_mail.put({
+                "id": str(uid),
+                "from": str(sender) if sender else "",
+                "subject": decode_header(subject)
+            })
+        logger.info(f"Inbox watcher queued {len(uids)} new emails")
@@ -1,16 +1,17 @@
 import asyncio
 import logging
 import os
-import json
-from pathlib import Path
-from anthropic import Anthropic
+from functools import lru_cache
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from gmail_client import GmailClient
-from google_docs_helper import GoogleDocsHelper
+from google_docs_helper import GoogleDocsHelper, CREDENTIALS_PATH, TOKEN_PATH
+from inbox_watcher import InboxWatcher
 
 # Import tools
-from tools import get_unread_emails, create_draft_reply, get_unread_and_draft_replies
+from tools import get_unread_emails, create_draft_reply, get_unread_and_draft_replies, collect_batch_drafts
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -21,39 +22,62 @@ GMAIL_EMAIL = os.getenv("EMAIL_USER")
 GMAIL_APP_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 GUIDELINES_DOC_ID = os.getenv("GUIDELINES_DOC_ID")
+WATCH_INBOX = os.getenv("WATCH_INBOX", "").lower() in ("1", "true", "yes")
 
+# Retries for transient Anthropic errors (408/409/429/5xx, connection errors).
+# The SDK backs off exponentially with jitter and honours retry-after headers.
+ANTHROPIC_MAX_RETRIES = 4
 
-if not GMAIL_EMAIL or not GMAIL_APP_PASSWORD:
-    raise ValueError("EMAIL_USER and EMAIL_APP_PASSWORD must be set in MCP client config")
 
-if not ANTHROPIC_API_KEY:
-    raise ValueError("ANTHROPIC_API_KEY must be set in MCP client config")
+# Clients are built on first use, so startup and list_tools stay cheap
+@lru_cache(maxsize=1)
+def get_gmail_client() -> GmailClient:
+    """Return the shared Gmail client."""
+    return GmailClient(GMAIL_EMAIL, GMAIL_APP_PASSWORD)
 
-logger.info(f"Gmail Assistant starting for {GMAIL_EMAIL}")
-
-# Create Gmail client
-gmail_client = GmailClient(GMAIL_EMAIL, GMAIL_APP_PASSWORD)
-
-# Create Anthropic client
-anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)  # Changed from 'anthropic' to 'anthropic_client'
-
-# Create Google Docs helper
-credentials_path = Path.home() / "mcp-servers/gmail-assistant-mcp/credentials.json"
-token_path = Path.home() / "mcp-servers/gmail-assistant-mcp/token.pickle"
-
-google_docs_helper = None
-if GUIDELINES_DOC_ID:
-    if credentials_path.exists() and token_path.exists():
-        google_docs_helper = GoogleDocsHelper(
-            credentials_path=str(credentials_path),
-            token_path=str(token_path)
+@lru_cache(maxsize=1)
+def get_anthropic_client() -> AsyncAnthropic:
+    """Return the shared Anthropic client.
+    
+    One pooled HTTP/2 connection is reused (and multiplexed) across
+    concurrent draft requests instead of a TLS handshake each.
+    """
+    return AsyncAnthropic(
+        api_key=ANTHROPIC_API_KEY,
+        max_retries=ANTHROPIC_MAX_RETRIES,
+        http_client=DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
         )
-        logger.info("Google Docs helper initialized")
-    else:
-        logger.warning("Google Docs credentials or token file does not exist - will not use email guidelines")
-else:
-    logger.warning("No GUIDELINES_DOC_ID set - will not use email guidelines")
-
+    )
+
+@lru_cache(maxsize=1)
+def get_inbox_watcher() -> InboxWatcher | None:
+    """Return the running inbox watcher, or None if WATCH_INBOX isn't set."""
+    if not WATCH_INBOX:
+        return None
+    inbox_watcher = InboxWatcher(GMAIL_EMAIL, GMAIL_APP_PASSWORD)
+    inbox_watcher.start()
+    return inbox_watcher
+
+@lru_cache(maxsize=1)
+def get_docs_helper() -> GoogleDocsHelper | None:
+    """Return the Google Docs helper, or None if guidelines aren't configured."""
+    if not GUIDELINES_DOC_ID:
+        logger.warning("No GUIDELINES_DOC_ID set - will not use email guidelines")
+        return None
+    
+    if not (CREDENTIALS_PATH.exists() and TOKEN_PATH.exists()):
+        # Signing in is interactive, so it happens in authorize.py, never here
+        logger.warning("Google Docs credentials or token file does not exist - run authorize.py to use email guidelines")
+        return None
+    
+    google_docs_helper = GoogleDocsHelper(
+        credentials_path=str(CREDENTIALS_PATH),
+        token_path=str(TOKEN_PATH)
+    )
+    logger.info("Google Docs helper initialized")
+    return google_docs_helper
 
 # Create server instance
 app = Server("gmail-assistant")
@@ -64,39 +88,61 @@ async def list_tools() -> list[Tool]:
     return [
         get_unread_emails.get_tool_definition(),
         create_draft_reply.get_tool_definition(),
-        get_unread_and_draft_replies.get_tool_definition()
+        get_unread_and_draft_replies.get_tool_definition(),
+        collect_batch_drafts.get_tool_definition()
     ]
 
+# Tool name -> handler taking the call arguments
+TOOLS = {
+    "get_unread_emails": lambda arguments: get_unread_emails.handle(
+        get_gmail_client(),
+        get_inbox_watcher(),
+        arguments
+    ),
+    "create_draft_reply": lambda arguments: create_draft_reply.handle(
+        get_gmail_client(),
+        get_anthropic_client(),
+        get_docs_helper(),
+        GUIDELINES_DOC_ID,
+        arguments
+    ),
+    "get_unread_and_draft_replies": lambda arguments: get_unread_and_draft_replies.handle(
+        get_gmail_client(),
+        get_anthropic_client(),
+        get_docs_helper(),
+        GUIDELINES_DOC_ID,
+        arguments
+    ),
+    "collect_batch_drafts": lambda arguments: collect_batch_drafts.handle(
+        get_gmail_client(),
+        get_anthropic_client(),
+        arguments
+    )
+}
+
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Handle tool calls."""
-    if name == "get_unread_emails":
-        return await get_unread_emails.handle(gmail_client, arguments)
-    
-    elif name == "create_draft_reply":  # FIXED INDENTATION - should be at same level as 'if name == "get_unread_emails"'
-        return await create_draft_reply.handle(
-            gmail_client,
-            anthropic_client,
-            google_docs_helper,
-            GUIDELINES_DOC_ID,
-            arguments
-        )
-    
-    elif name == "get_unread_and_draft_replies":
-        return await get_unread_and_draft_replies.handle(
-            gmail_client,
-            anthropic_client,
-            google_docs_helper,
-            GUIDELINES_DOC_ID,
-            arguments
-        )
-
-    raise ValueError(f"Unknown tool: {name}")
+    handler = TOOLS.get(name)
+    if handler is None:
+        raise ValueError(f"Unknown tool: {name}")
+    return await handler(arguments)
 
 async def main():
     """Run the server."""
     from mcp.server.stdio import stdio_server
     
+    if not GMAIL_EMAIL or not GMAIL_APP_PASSWORD:
+        raise ValueError("EMAIL_USER and EMAIL_APP_PASSWORD must be set in MCP client config")
+    
+    if not ANTHROPIC_API_KEY:
+        raise ValueError("ANTHROPIC_API_KEY must be set in MCP client config")
+    
+    logger.info(f"Gmail Assistant starting for {GMAIL_EMAIL}")
+    
+    # Start watching now so mail arriving before the first tool call is queued
+    get_inbox_watcher()
+    
     async with stdio_server() as (read_stream, write_stream):
         logger.info(f"Gmail Assistant MCP server running for {GMAIL_EMAIL}")
         await app.run(
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from mcp.types import Tool, TextContent
+from gmail_client import GmailClient
+from anthropic import AsyncAnthropic
+from helpers.reply_generator import collect_replies_batch
+from helpers.draft_saver import save_replies, format_results
+from helpers import draft_cache
+
+logger = logging.getLogger("gmail-assistant")
+
+# Serializes collections so concurrent calls can't save the same batch twice
+_collect_lock = asyncio.Lock()
+
+TOOL_DEFINITION = Tool(
+    name="collect_batch_drafts",
+    description="Save the draft replies from a message batch submitted by get_unread_and_draft_replies with use_batch",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "batch_id": {
+                "type": "string",
+                "description": "The message batch ID returned by get_unread_and_draft_replies"
+            }
+        },
+        "required": ["batch_id"]
+    }
+)
+
+def get_tool_definition() -> Tool:
+    """Return the tool definition for MCP."""
+    return TOOL_DEFINITION
+
+async def handle(
+    gmail_client: GmailClient,
+    anthropic_client: AsyncAnthropic,
+    arguments: dict
+) -> list[TextContent]:
+    """Handle the collect_batch_drafts tool call."""
+    batch_id = arguments.get("batch_id")
+
+    try:
+        async with _collect_lock:
+            pending_emails = draft_cache.get_batch(batch_id)
+            if not pending_emails:
+                return [
+                    TextContent(
+                        type="text",
+                        text=f"No pending message batch {batch_id} - its drafts may already have been saved"
+                    )
+                ]
+
+            replies = await collect_replies_batch(anthropic_client, batch_id)
+            if replies is None:
+                return [
+                    TextContent(
+                        type="text",
+                        text=f"⏳ Message batch {batch_id} is still processing - try again in a few minutes"
+                    )
+                ]
+
+            # Emails drafted since the batch was submitted don't need another draft
+            already_drafted = [
+                email_item for email_item in pending_emails
+                if draft_cache.get_draft_id(email_item['hash']) is not None
+            ]
+            drafts = [email_item for email_item in pending_emails if email_item not in already_drafted]
+
+            saved_results = await save_replies(gmail_client, drafts, replies)
+
+            # Keep emails whose draft failed to save so collecting again retries them
+            draft_cache.forget_batch(batch_id, [email_item['id'] for email_item in already_drafted] + [
+                draft['id'] for draft, result in zip(drafts, saved_results)
+                if not result.get('save_failed')
+            ])
+
+        saved_results = dict(zip((draft['id'] for draft in drafts), saved_results))
+        results = [
+            saved_results[email_item['id']] if email_item['id'] in saved_results else {
+                "from": email_item['to_email'],
+                "subject": email_item['subject'],
+                "status": "♻️ Draft already exists"
+            }
+            for email_item in pending_emails
+        ]
+
+        # Format summary
+        parts = [f"📧 Collected message batch {batch_id} for {len(pending_emails)} emails:\n\n", format_results(results)]
+
+        return [
+            TextContent(
+                type="text",
+                text="".join(parts)
+            )
+        ]
+
+    except Exception as e:
+        logger.error(f"Error in collect_batch_drafts: {e}")
+        return [
+            TextContent(
+                type="text",
+                text=f"Error: {str(e)}"
+            )
+        ]
@@ -1,44 +1,48 @@
+import asyncio
 import logging
 from mcp.types import Tool, TextContent
 from gmail_client import GmailClient
 from google_docs_helper import GoogleDocsHelper
-from anthropic import Anthropic
-from helpers.prompt_builder import fetch_guidelines, build_reply_prompt
+from anthropic import AsyncAnthropic
+from helpers.prompt_builder import fetch_guidelines, build_system_prompt, build_reply_prompt
+from helpers.reply_generator import generate_reply
 
 logger = logging.getLogger("gmail-assistant")
 
+TOOL_DEFINITION = Tool(
+    name="create_draft_reply",
+    description="Generate an AI-powered draft reply to an email and save it in Gmail",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "email_id": {
+                "type": "string",
+                "description": "The ID of the email to reply to"
+            },
+            "email_content": {
+                "type": "string",
+                "description": "The content of the email to reply to"
+            },
+            "sender": {
+                "type": "string",
+                "description": "The sender of the original email"
+            },
+            "subject": {
+                "type": "string",
+                "description": "The subject of the original email"
+            }
+        },
+        "required": ["email_id", "email_content", "sender", "subject"]
+    }
+)
+
 def get_tool_definition() -> Tool:
     """Return the tool definition for MCP."""
-    return Tool(
-        name="create_draft_reply",
-        description="Generate an AI-powered draft reply to an email and save it in Gmail",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "email_id": {
-                    "type": "string",
-                    "description": "The ID of the email to reply to"
-                },
-                "email_content": {
-                    "type": "string",
-                    "description": "The content of the email to reply to"
-                },
-                "sender": {
-                    "type": "string",
-                    "description": "The sender of the original email"
-                },
-                "subject": {
-                    "type": "string",
-                    "description": "The subject of the original email"
-                }
-            },
-            "required": ["email_id", "email_content", "sender", "subject"]
-        }
-    )
+    return TOOL_DEFINITION
 
 async def handle(
     gmail_client: GmailClient,
-    anthropic_client: Anthropic,
+    anthropic_client: AsyncAnthropic,
     google_docs_helper: GoogleDocsHelper,
     guidelines_doc_id: str,
     arguments: dict
@@ -50,27 +54,26 @@ async def handle(
     subject = arguments.get("subject")
     
     try:
-        # Fetch guidelines
-        guidelines = await fetch_guidelines(google_docs_helper, guidelines_doc_id)
+        # Fetch guidelines while warming up the Gmail connection
+        guidelines, _ = await asyncio.gather(
+            fetch_guidelines(google_docs_helper, guidelines_doc_id),
+            asyncio.to_thread(gmail_client.ensure_connected)
+        )
 
         # Build the prompt
-        prompt = build_reply_prompt(sender, subject, email_content, guidelines)
+        system = build_system_prompt(guidelines)
+        prompt = build_reply_prompt(sender, subject, email_content)
 
         # Generate reply
         logger.info("Requesting AI-generated reply via Anthropic API...")
         
-        message = anthropic_client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1000,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        generated_reply = message.content[0].text
+        generated_reply = await generate_reply(anthropic_client, prompt, system)
         
-        logger.info(f"Generated reply (first 100 chars): {generated_reply[:100]}...")
+        logger.info("Generated reply (first 100 chars): %.100s...", generated_reply)
         
         # Create draft in Gmail
-        gmail_client.create_draft_reply(
+        await asyncio.to_thread(
+            gmail_client.create_draft_reply,
             to_email=sender,
             subject=subject,
             body=generated_reply
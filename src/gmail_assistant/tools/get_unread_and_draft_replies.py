@@ -1,110 +1,171 @@
+import asyncio
 import logging
 from mcp.types import Tool, TextContent
 from gmail_client import GmailClient
 from google_docs_helper import GoogleDocsHelper
-from anthropic import Anthropic
-from helpers.prompt_builder import fetch_guidelines, build_reply_prompt
+from anthropic import AsyncAnthropic
+from helpers.prompt_builder import fetch_guidelines, build_system_prompt, build_reply_prompt
+from helpers.reply_generator import generate_reply, submit_replies_batch
+from helpers.draft_saver import save_replies, format_results
+from helpers import draft_cache
 
 logger = logging.getLogger("gmail-assistant")
 
-def get_tool_definition() -> Tool:
-    """Return the tool definition for MCP."""
-    return Tool(
-        name="get_unread_and_draft_replies",
-        description="Fetch unread emails and automatically create AI-powered draft replies for all emails sent directly to you (not CC'd)",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "max_results": {
-                    "type": "number",
-                    "description": "Maximum number of emails to fetch (default: 10)",
-                    "default": 10
-                }
+# Max Anthropic requests in flight at once - keeps us under rate limits
+MAX_CONCURRENT_DRAFTS = 5
+
+# Bodies this short (auto-replies, header-only invites) aren't worth a reply
+MIN_BODY_CHARS = 32
+
+TOOL_DEFINITION = Tool(
+    name="get_unread_and_draft_replies",
+    description="Fetch unread emails and automatically create AI-powered draft replies for all emails sent directly to you (not CC'd)",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "max_results": {
+                "type": "number",
+                "description": "Maximum number of emails to fetch (default: 10)",
+                "default": 10
+            },
+            "use_batch": {
+                "type": "boolean",
+                "description": "Submit replies as an Anthropic Message Batch - half the cost, but the drafts are only saved once you call collect_batch_drafts, usually a few minutes later (default: false)",
+                "default": False
             }
         }
-    )
+    }
+)
+
+def get_tool_definition() -> Tool:
+    """Return the tool definition for MCP."""
+    return TOOL_DEFINITION
 
 async def handle(
     gmail_client: GmailClient,
-    anthropic_client: Anthropic,
+    anthropic_client: AsyncAnthropic,
     google_docs_helper: GoogleDocsHelper,
     guidelines_doc_id: str,
     arguments: dict
 ) -> list[TextContent]:
     """Handle the get_unread_and_draft_replies tool call."""
     max_results = arguments.get("max_results", 10)
+    use_batch = arguments.get("use_batch", False)
 
     try:
-        # Fetch emails
-        emails = gmail_client.get_unread_emails(max_results=max_results)
-        to_me_emails = emails['to_me']
+        # Fetch emails and guidelines concurrently
+        emails, guidelines = await asyncio.gather(
+            asyncio.to_thread(gmail_client.get_unread_emails, max_results=max_results),
+            fetch_guidelines(google_docs_helper, guidelines_doc_id)
+        )
+        
+        # Drop empty bodies and cap the number of replies we ask the LLM for
+        with_body = [email_item for email_item in emails['to_me'] if len(email_item.get('body') or "") > MIN_BODY_CHARS]
+        skipped_empty = len(emails['to_me']) - len(with_body)
+        to_me_emails = with_body[:max_results]
     
         if not to_me_emails:
+            no_emails = "📭 No unread emails sent directly to you!"
+            if skipped_empty:
+                no_emails += f"\n\n⏭️ Skipped {skipped_empty} emails with empty or very short bodies"
             return [
                 TextContent(
                     type="text",
-                    text="📭 No unread emails sent directly to you!"
+                    text=no_emails
                 )
             ]
         
-        # Fetch guidelines once
-        guidelines = await fetch_guidelines(google_docs_helper, guidelines_doc_id)
+        system = build_system_prompt(guidelines)
         
-        # Create drafts for all "To Me" emails
-        results = []
-        for email_item in to_me_emails:
+        # Skip emails already drafted by an earlier run (same id and body), or
+        # waiting in a message batch that hasn't been collected yet
+        hashes = {email_item['id']: draft_cache.email_hash(email_item) for email_item in to_me_emails}
+        skipped_status = {}
+        for email_id, email_hash in hashes.items():
+            if draft_cache.get_draft_id(email_hash) is not None:
+                skipped_status[email_id] = "♻️ Draft already exists"
+            else:
+                batch_id = draft_cache.get_pending_batch_id(email_hash)
+                if batch_id:
+                    skipped_status[email_id] = f"⏳ Pending in message batch {batch_id}"
+        pending_emails = [email_item for email_item in to_me_emails if email_item['id'] not in skipped_status]
+        drafts = [
+            {
+                "id": email_item['id'],
+                "to_email": email_item['from'],
+                "subject": email_item['subject'],
+                "hash": hashes[email_item['id']]
+            }
+            for email_item in pending_emails
+        ]
+        
+        # Build prompts
+        prompts = {
+            email_item['id']: build_reply_prompt(
+                email_item['from'],
+                email_item['subject'],
+                email_item['body']
+            )
+            for email_item in pending_emails
+        }
+        
+        # Optionally submit every reply as one Message Batch, saved later by collect_batch_drafts
+        if use_batch and len(pending_emails) > 1:
             try:
-                logger.info(f"Creating draft for email from {email_item['from']}")
-                
-                # Build prompt
-                prompt = build_reply_prompt(
-                    email_item['from'],
-                    email_item['subject'],
-                    email_item['body'],
-                    guidelines
-                )
-                
-                # Generate reply
-                message = anthropic_client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=1000,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                
-                generated_reply = message.content[0].text
-                
-                # Create draft
-                gmail_client.create_draft_reply(
-                    to_email=email_item['from'],
-                    subject=email_item['subject'],
-                    body=generated_reply
-                )
-                
-                results.append({
-                    "from": email_item['from'],
-                    "subject": email_item['subject'],
-                    "status": "✅ Draft created",
-                    "preview": generated_reply[:100] + "..."
-                })
-                
+                batch_id = await submit_replies_batch(anthropic_client, prompts, system)
             except Exception as e:
-                logger.error(f"Error creating draft for {email_item['from']}: {e}")
-                results.append({
-                    "from": email_item['from'],
-                    "subject": email_item['subject'],
-                    "status": f"❌ Failed: {str(e)}"
-                })
+                logger.warning(f"Message batch failed, falling back to individual requests: {e}")
+            else:
+                draft_cache.record_batch(batch_id, drafts)
+                
+                parts = [
+                    f"⏳ Submitted replies to {len(pending_emails)} emails as message batch {batch_id}.\n\n"
+                    "Batches usually finish within a few minutes - call collect_batch_drafts with this batch_id to save the drafts."
+                ]
+                if skipped_status:
+                    parts.append(f"\n\n♻️ {len(skipped_status)} emails already have or are waiting on drafts")
+                if skipped_empty:
+                    parts.append(f"\n\n⏭️ Skipped {skipped_empty} emails with empty or very short bodies")
+                parts.append(f"\n\n📋 Skipped {len(emails['cc_me'])} CC'd emails (no drafts created)")
+                return [
+                    TextContent(
+                        type="text",
+                        text="".join(parts)
+                    )
+                ]
         
-        # Format summary
-        summary = f"""📧 Processed {len(to_me_emails)} emails sent directly to you:
-
-"""
-        for result in results:
-            summary += f"\n{result['status']} - From: {result['from']}\n   Subject: {result['subject']}\n"
-            if 'preview' in result:
-                summary += f"   Preview: {result['preview']}\n"
+        # Generate replies for all "To Me" emails concurrently
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DRAFTS)
+        
+        async def generate_one(email_item: dict) -> str:
+            async with semaphore:
+                logger.info(f"Generating reply for email from {email_item['from']}")
+                return await generate_reply(anthropic_client, prompts[email_item['id']], system)
+        
+        replies = await asyncio.gather(
+            *(generate_one(email_item) for email_item in pending_emails),
+            return_exceptions=True
+        )
+        replies = dict(zip((email_item['id'] for email_item in pending_emails), replies))
+        
+        saved_results = await save_replies(gmail_client, drafts, replies)
+        saved_results = dict(zip((draft['id'] for draft in drafts), saved_results))
         
-        summary += f"\n\n📋 Skipped {len(emails['cc_me'])} CC'd emails (no drafts created)"
+        results = [
+            saved_results[email_item['id']] if email_item['id'] in saved_results else {
+                "from": email_item['from'],
+                "subject": email_item['subject'],
+                "status": skipped_status[email_item['id']]
+            }
+            for email_item in to_me_emails
+        ]
+        
+        # Format summary
+        parts = [f"📧 Processed {len(to_me_emails)} emails sent directly to you:\n\n", format_results(results)]
+        if skipped_empty:
+            parts.append(f"\n\n⏭️ Skipped {skipped_empty} emails with empty or very short bodies")
+        parts.append(f"\n\n📋 Skipped {len(emails['cc_me'])} CC'd emails (no drafts created)")
+        summary = "".join(parts)
         
         return [
             TextContent(
@@ -1,42 +1,58 @@
-import json
+import asyncio
 import logging
+import orjson
 from mcp.types import Tool, TextContent
 from gmail_client import GmailClient
+from inbox_watcher import InboxWatcher
 
 logger = logging.getLogger("gmail-assistant")
 
-def get_tool_definition() -> Tool:
-    """Return the tool definition for MCP."""
-    return Tool(
-        name="get_unread_emails",
-        description="Fetch unread emails from Gmail",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "max_results": {
-                    "type": "number",
-                    "description": "Maximum number of emails to fetch (default: 10)",
-                    "default": 10
-                }
+TOOL_DEFINITION = Tool(
+    name="get_unread_emails",
+    description="Fetch unread emails from Gmail",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "max_results": {
+                "type": "number",
+                "description": "Maximum number of emails to fetch (default: 10)",
+                "default": 10
             }
         }
-    )
+    }
+)
+
+def get_tool_definition() -> Tool:
+    """Return the tool definition for MCP."""
+    return TOOL_DEFINITION
 
-async def handle(gmail_client: GmailClient, arguments: dict) -> list[TextContent]:
+async def handle(gmail_client: GmailClient, inbox_watcher: InboxWatcher | None, arguments: dict) -> list[TextContent]:
     """Handle the get_unread_emails tool call."""
     max_results = arguments.get("max_results", 10)
     
     try:
-        emails = gmail_client.get_unread_emails(max_results=max_results)
+        # IMAP fetch and parsing are blocking - keep them off the event loop
+        emails = await asyncio.to_thread(gmail_client.get_unread_emails, max_results=max_results)
 
         # Format the grouped results
+        to_me_json = orjson.dumps(emails['to_me'], option=orjson.OPT_INDENT_2).decode()
+        cc_me_json = orjson.dumps(emails['cc_me'], option=orjson.OPT_INDENT_2).decode()
         result = f"""📧 UNREAD EMAILS (Latest {max_results})
 
 📩 DIRECTLY TO YOU ({len(emails['to_me'])} emails):
-{json.dumps(emails['to_me'], indent=2)}
+{to_me_json}
 
 📋 CC'D TO YOU ({len(emails['cc_me'])} emails):
-{json.dumps(emails['cc_me'], indent=2)}
+{cc_me_json}
+"""
+        
+        # Emails the inbox watcher saw arrive since the last call
+        if inbox_watcher:
+            new_mail = inbox_watcher.pop_new_mail()
+            new_mail_json = orjson.dumps(new_mail, option=orjson.OPT_INDENT_2).decode()
+            result += f"""
+🔔 ARRIVED SINCE LAST CHECK ({len(new_mail)} emails):
+{new_mail_json}
 """
 
         return [
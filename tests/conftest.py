@@ -0,0 +1,13 @@
+import pytest
+
+from helpers import draft_cache
+
+
+@pytest.fixture
+def draft_cache_db(tmp_path, monkeypatch):
+    """Point the draft cache at a fresh sqlite file."""
+    monkeypatch.setattr(draft_cache, "DRAFT_CACHE_PATH", tmp_path / "cache.sqlite")
+    monkeypatch.setattr(draft_cache, "_connection", None)
+    yield tmp_path / "cache.sqlite"
+    if draft_cache._connection is not None:
+        draft_cache._connection.close()
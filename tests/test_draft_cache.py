@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from helpers import draft_cache
+
+
+pytestmark = pytest.mark.usefixtures("draft_cache_db")
+
+
+def test_email_hash_depends_on_id_and_body():
+    email_item = {"id": "1", "body": "hello"}
+    assert draft_cache.email_hash(email_item) == draft_cache.email_hash(dict(email_item))
+    assert draft_cache.email_hash(email_item) != draft_cache.email_hash({"id": "2", "body": "hello"})
+    assert draft_cache.email_hash(email_item) != draft_cache.email_hash({"id": "1", "body": "hello!"})
+
+
+def test_record_and_get_draft_id():
+    assert draft_cache.get_draft_id("abc") is None
+    draft_cache.record_draft("abc", "42")
+    assert draft_cache.get_draft_id("abc") == "42"
+    # Servers without UIDPLUS give no draft id, which still counts as drafted
+    draft_cache.record_draft("def", "")
+    assert draft_cache.get_draft_id("def") == ""
+
+
+def test_cache_persists_across_connections(monkeypatch):
+    draft_cache.record_draft("abc", "42")
+    draft_cache._connection.close()
+    monkeypatch.setattr(draft_cache, "_connection", None)
+    assert draft_cache.get_draft_id("abc") == "42"
+
+
+def test_old_entries_are_pruned_on_open(monkeypatch):
+    draft_cache.record_draft("old", "1")
+    draft_cache.record_draft("new", "2")
+    with draft_cache._connection:
+        draft_cache._connection.execute(
+            "UPDATE cache SET ts = ? WHERE hash = 'old'",
+            (int(time.time()) - draft_cache.DRAFT_CACHE_MAX_AGE_SECONDS - 1,)
+        )
+    draft_cache._connection.close()
+    monkeypatch.setattr(draft_cache, "_connection", None)
+    assert draft_cache.get_draft_id("old") is None
+    assert draft_cache.get_draft_id("new") == "2"
+
+
+def test_batch_round_trip_and_partial_forget():
+    emails = [
+        {"id": "2", "to_email": "b@example.com", "subject": "B", "hash": "hb"},
+        {"id": "1", "to_email": "a@example.com", "subject": "A", "hash": "ha"},
+    ]
+    draft_cache.record_batch("batch", emails)
+    assert draft_cache.get_batch("batch") == emails
+    assert draft_cache.get_batch("other") == []
+
+    draft_cache.forget_batch("batch", ["2"])
+    assert draft_cache.get_batch("batch") == emails[1:]
+
+
+def test_get_pending_batch_id():
+    draft_cache.record_batch("batch", [{"id": "1", "to_email": "a@example.com", "subject": "A", "hash": "ha"}])
+    assert draft_cache.get_pending_batch_id("ha") == "batch"
+    assert draft_cache.get_pending_batch_id("hb") is None
+    draft_cache.forget_batch("batch", ["1"])
+    assert draft_cache.get_pending_batch_id("ha") is None
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from helpers import draft_cache
+from helpers.draft_saver import save_replies, format_results
+
+
+pytestmark = pytest.mark.usefixtures("draft_cache_db")
+
+
+class FakeGmailClient:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.drafts = []
+
+    def create_draft_replies(self, drafts):
+        self.drafts.extend(drafts)
+        return [self.outcomes.pop(0) for _ in drafts]
+
+
+def make_email(email_id):
+    return {"id": email_id, "to_email": f"{email_id}@example.com", "subject": f"S{email_id}", "hash": f"h{email_id}"}
+
+
+def test_save_replies_saves_records_and_reports_in_order():
+    gmail_client = FakeGmailClient("101", OSError("connection lost"))
+    emails = [make_email("1"), make_email("2"), make_email("3")]
+    replies = {"1": "reply one", "2": RuntimeError("generation failed"), "3": "reply three"}
+
+    results = asyncio.run(save_replies(gmail_client, emails, replies))
+
+    assert [draft["to_email"] for draft in gmail_client.drafts] == ["1@example.com", "3@example.com"]
+    assert results[0]["status"] == "✅ Draft created"
+    assert results[0]["preview"] == "reply one..."
+    assert results[1]["status"] == "❌ Failed: generation failed"
+    assert not results[1]["save_failed"]
+    assert results[2]["status"] == "❌ Failed: connection lost"
+    assert results[2]["save_failed"]
+    assert draft_cache.get_draft_id("h1") == "101"
+    assert draft_cache.get_draft_id("h3") is None
+
+
+def test_save_replies_missing_reply_fails():
+    results = asyncio.run(save_replies(FakeGmailClient(), [make_email("1")], {}))
+    assert results[0]["status"].startswith("❌ Failed")
+
+
+def test_format_results():
+    results = [
+        {"from": "a@example.com", "subject": "A", "status": "✅ Draft created", "preview": "Hi..."},
+        {"from": "b@example.com", "subject": "B", "status": "♻️ Draft already exists"},
+    ]
+    assert format_results(results) == (
+        "\n✅ Draft created - From: a@example.com\n   Subject: A\n   Preview: Hi...\n"
+        "\n♻️ Draft already exists - From: b@example.com\n   Subject: B\n"
+    )
@@ -0,0 +1,101 @@
+import base64
+import quopri
+
+import orjson
+
+from gmail_client import GmailClient, decode_header
+
+BODY_TEXT = "héllo wörld " * 20
+
+
+def make_client():
+    return GmailClient("me@example.com", "app-password")
+
+
+def test_split_sections_matches_echoed_section_names():
+    # The server echoes sections without .PEEK and with the partial origin
+    data = {
+        b"BODY[HEADER.FIELDS (FROM TO CC SUBJECT)]": b"To: me@example.com\r\n\r\n",
+        b"BODY[TEXT]<0>": b"hello",
+        b"SEQ": 1,
+    }
+    assert make_client()._split_sections(data) == (b"To: me@example.com\r\n\r\n", b"hello")
+
+
+def test_split_sections_missing_values_are_empty():
+    data = {b"BODY[HEADER.FIELDS (FROM)]": None}
+    assert make_client()._split_sections(data) == (b"", b"")
+
+
+def test_decode_body_base64_drops_partial_quantum():
+    encoded = base64.encodebytes(BODY_TEXT.encode())
+    # Cut mid-quantum, as the partial fetch can
+    truncated = encoded[:len(encoded) - 3]
+    body = make_client()._decode_body(truncated, "base64")
+    assert body
+    assert BODY_TEXT.startswith(body.rstrip("�"))
+
+
+def test_decode_body_quoted_printable():
+    encoded = quopri.encodestring(BODY_TEXT.encode())
+    assert make_client()._decode_body(encoded, " Quoted-Printable ") == BODY_TEXT
+
+
+def test_decode_body_truncates_to_max_len():
+    assert make_client()._decode_body(b"x" * 50, "7bit", max_len=10) == "x" * 10
+
+
+def test_parse_email_multipart_reparses_for_text_part():
+    header = (
+        b"From: Sender <sender@example.com>\r\n"
+        b"To: me@example.com\r\n"
+        b"Subject: Multipart\r\n"
+        b'Content-Type: multipart/alternative; boundary="b1"\r\n'
+        b"\r\n"
+    )
+    text = (
+        b"--b1\r\n"
+        b"Content-Type: text/html\r\n\r\n"
+        b"<p>html</p>\r\n"
+        b"--b1\r\n"
+        b"Content-Type: text/plain\r\n\r\n"
+        b"plain text body\r\n"
+        b"--b1--\r\n"
+    )
+    bucket, data = make_client()._parse_email("7", header, text)
+    assert bucket == "to_me"
+    assert data["id"] == "7"
+    assert data["subject"] == "Multipart"
+    assert data["body"].strip() == "plain text body"
+
+
+def test_parse_email_classifies_cc():
+    header = b"To: someone@example.com\r\nCc: Me <ME@example.com>\r\n\r\n"
+    bucket, _ = make_client()._parse_email("1", header, b"body")
+    assert bucket == "cc_me"
+
+
+def test_parse_email_raw_8bit_headers_are_decoded():
+    header = (
+        "From: José <jose@example.com>\r\n"
+        "To: me@example.com\r\n"
+        "Subject: Café =?utf-8?q?m=C3=A9nu?=\r\n"
+        "Message-ID: <é@example.com>\r\n"
+        "\r\n"
+    ).encode()
+    _, data = make_client()._parse_email("1", header, b"body")
+    assert data["from"] == "José <jose@example.com>"
+    assert data["subject"] == "Café ménu"
+    assert data["message_id"] == "<é@example.com>"
+    orjson.dumps(data)
+
+
+def test_parse_email_raw_latin1_headers_are_decoded():
+    header = "From: José <jose@example.com>\r\nTo: me@example.com\r\n\r\n".encode("latin-1")
+    _, data = make_client()._parse_email("1", header, b"body")
+    assert data["from"] == "José <jose@example.com>"
+
+
+def test_decode_header_unknown_charset_falls_back():
+    assert decode_header("=?x-bogus?q?abc?=") == "abc"
+    assert decode_header("=?utf-8?q?h=C3=A9llo?=") == "héllo"
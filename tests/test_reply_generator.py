@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+import anthropic
+import httpx
+import pytest
+
+from helpers import reply_generator
+from helpers.reply_generator import _batch_replies, generate_reply
+
+
+def make_entry(custom_id, result_type, text=""):
+    message = SimpleNamespace(content=[
+        SimpleNamespace(type="text", text=text),
+        SimpleNamespace(type="tool_use"),
+    ])
+    return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type=result_type, message=message))
+
+
+def test_batch_replies_maps_by_custom_id():
+    entries = [make_entry("2", "succeeded", "second"), make_entry("1", "succeeded", "first")]
+    assert _batch_replies(entries) == {"1": "first", "2": "second"}
+
+
+def test_batch_replies_failed_requests_become_exceptions():
+    replies = _batch_replies([make_entry("1", "errored"), make_entry("2", "expired")])
+    assert isinstance(replies["1"], RuntimeError)
+    assert "expired" in str(replies["2"])
+
+
+def make_status_error(status_code, error_type):
+    response = httpx.Response(status_code, request=httpx.Request("POST", "https://api.anthropic.com/v1/messages"))
+    body = {"type": "error", "error": {"type": error_type}}
+    return anthropic.APIStatusError(error_type, response=response, body=body)
+
+
+class FakeStream:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        async def deltas():
+            yield "Hello "
+            if isinstance(self.outcome, Exception):
+                raise self.outcome
+            yield self.outcome
+        return deltas()
+
+
+def make_client(*outcomes, max_retries=2):
+    outcomes = list(outcomes)
+    calls = []
+
+    def stream(**params):
+        calls.append(params)
+        return FakeStream(outcomes.pop(0))
+
+    client = SimpleNamespace(max_retries=max_retries, messages=SimpleNamespace(stream=stream))
+    return client, calls
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(reply_generator, "STREAM_RETRY_INITIAL_DELAY", 0)
+
+
+def test_generate_reply_joins_stream_deltas():
+    client, calls = make_client("world")
+    assert asyncio.run(generate_reply(client, "prompt", [])) == "Hello world"
+    assert calls[0]["messages"] == [{"role": "user", "content": "prompt"}]
+    assert "system" not in calls[0]
+
+
+def test_generate_reply_retries_mid_stream_overload():
+    client, calls = make_client(make_status_error(200, "overloaded_error"), "again")
+    assert asyncio.run(generate_reply(client, "prompt", [])) == "Hello again"
+    assert len(calls) == 2
+
+
+def test_generate_reply_gives_up_after_max_retries():
+    error = make_status_error(200, "overloaded_error")
+    client, calls = make_client(error, error, max_retries=1)
+    with pytest.raises(anthropic.APIStatusError):
+        asyncio.run(generate_reply(client, "prompt", []))
+    assert len(calls) == 2
+
+
+def test_generate_reply_does_not_retry_sdk_handled_errors():
+    # Non-200 errors were already retried by the SDK before reaching us
+    client, calls = make_client(make_status_error(529, "overloaded_error"), "unused")
+    with pytest.raises(anthropic.APIStatusError):
+        asyncio.run(generate_reply(client, "prompt", []))
+    assert len(calls) == 1
+
+
+def test_generate_reply_does_not_retry_invalid_request():
+    client, calls = make_client(make_status_error(200, "invalid_request_error"), "unused")
+    with pytest.raises(anthropic.APIStatusError):
+        asyncio.run(generate_reply(client, "prompt", []))
+    assert len(calls) == 1